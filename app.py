@@ -1,16 +1,37 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
 import os
+import pathlib
+import shutil
 import sys
+import threading
+import uuid
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RUNBOOK_DIR = os.path.join(BASE_DIR, "runbooks")
 
 # Add src to path for proper imports
-sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
+sys.path.append(os.path.join(BASE_DIR, "src"))
 
 from chatbot import RunbookChatbot
 from analyzer import RunbookAnalyzer
+from io_utils import scan_markdown
+from upload_utils import (
+    add_to_index,
+    clear_session_index,
+    delete_upload,
+    file_hash,
+    get_upload_dir,
+    load_doc_text,
+    persist_upload,
+    read_index,
+    remove_from_index,
+    session_upload_dir
+)
 
 # Page configuration
 st.set_page_config(
@@ -20,18 +41,234 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize session state
-if 'chatbot' not in st.session_state:
-    st.session_state.chatbot = RunbookChatbot()
+# Created once per process; each session's files go in a subdirectory
+UPLOAD_DIR = get_upload_dir(os.path.join(BASE_DIR, "uploads"))
+
+
+@st.cache_resource
+def get_chatbot():
+    # Shared across sessions; per-user conversation state lives in st.session_state.messages
+    return RunbookChatbot()
+
+
+@st.cache_resource
+def get_analyzer():
+    return RunbookAnalyzer()
+
+
+@st.cache_data
+def read_markdown(path, mtime, max_bytes=512 * 1024):
+    """Read a runbook for display, capped at max_bytes and cached by mtime."""
+    with pathlib.Path(path).open('rb') as f:
+        data = f.read(max_bytes + 1)
+    content = data[:max_bytes].decode('utf-8', errors='replace')
+    if len(data) > max_bytes:
+        content += "\n… (truncated)"
+    return content
+
+
+@st.cache_data(ttl=5)
+def list_runbooks(runbook_dir, mtime):
+    """Names of the markdown runbooks in a directory, cached by the directory mtime."""
+    return [e.name for e in scan_markdown(runbook_dir)]
+
+
+@st.fragment
+def render_uploader(key, label, types, help_text, accept_multiple_files=False):
+    """Render a file uploader and register its files as uploaded documents.
+
+    Runs as a fragment so uploads do not rerun the whole page; a full rerun is
+    only triggered when a new document was added.
+    """
+    uploaded = st.file_uploader(
+        label,
+        type=types,
+        accept_multiple_files=accept_multiple_files,
+        help=help_text,
+        key=key
+    )
+    if not uploaded:
+        return
+
+    uploaded_files = uploaded if accept_multiple_files else [uploaded]
+    session_id = st.session_state.upload_session
+    upload_dir = session_upload_dir(UPLOAD_DIR, session_id)
+    upload_hashes = {doc['sha256'] for doc in read_index(UPLOAD_DIR, session_id)}
+    added = False
+
+    for uploaded_file in uploaded_files:
+        # Unchanged uploads are skipped before touching the disk
+        h = file_hash(uploaded_file)
+        if h in upload_hashes:
+            continue
+
+        doc_info = persist_upload(h, uploaded_file.name, upload_dir, uploaded_file)
+
+        add_to_index(UPLOAD_DIR, session_id, doc_info)
+        upload_hashes.add(h)
+        added = True
+
+    if accept_multiple_files:
+        st.success(f"Successfully uploaded {len(uploaded_files)} document(s)!")
+    else:
+        st.success(f"✅ {uploaded.name} uploaded successfully!")
+
+    if added:
+        # The document lists outside this fragment need to pick up the new files
+        st.rerun()
+
+
+@st.fragment
+def render_sidebar_actions():
+    """Quick action buttons; the full page is only rerun after an action changed state."""
+    st.subheader("Quick Actions")
+    if st.button("🔄 Analyze All Runbooks"):
+        with st.spinner("Analyzing runbooks..."):
+            analyses = get_analyzer().analyze_all_runbooks(RUNBOOK_DIR)
+            health_summary = get_analyzer().get_health_summary(analyses)
+            st.session_state.analysis_data = {
+                "analyses": analyses,
+                "health_summary": health_summary,
+                "timestamp": datetime.now()
+            }
+        st.toast("Analysis complete!")
+        st.rerun()
+
+    if st.button("🗑️ Clear Chat History"):
+        st.session_state.messages = []
+        st.toast("Chat history cleared!")
+        st.rerun()
+
+    if st.button("🗂️ Clear Uploaded Documents"):
+        # Only this session's documents are cleared
+        session_id = st.session_state.upload_session
+        clear_session_index(UPLOAD_DIR, session_id)
+        session_dir = session_upload_dir(UPLOAD_DIR, session_id)
+        if os.path.exists(session_dir):
+            # Move the directory aside (cheap) and delete it in the background so
+            # a large uploads dir does not block the UI or race new uploads
+            trash_dir = f"{session_dir}.deleting-{uuid.uuid4().hex}"
+            os.rename(session_dir, trash_dir)
+            threading.Thread(
+                target=shutil.rmtree,
+                args=(trash_dir,),
+                kwargs={"ignore_errors": True},
+                daemon=True
+            ).start()
+        st.toast("Uploaded documents cleared!")
+        st.rerun()
+
+
+# Chart builders are pure functions of their inputs, so the figures are cached
+# instead of being rebuilt and re-serialized on every rerun.
+@st.cache_data
+def make_health_bar(health_summary):
+    health_df = pd.DataFrame.from_records([
+        {"Category": "Completeness", "Score": health_summary["average_completeness"]},
+        {"Category": "Structure", "Score": health_summary["average_structure"]},
+        {"Category": "Safety", "Score": health_summary["average_safety"]},
+        {"Category": "Clarity", "Score": health_summary["average_clarity"]}
+    ])
+
+    fig = px.bar(health_df, x="Category", y="Score",
+                title="Average Health Scores by Category",
+                color="Score",
+                color_continuous_scale="RdYlGn")
+    fig.update_layout(yaxis_range=[0, 100])
+    return fig
+
+
+@st.cache_data
+def make_issues_pie(runbook_df):
+    return px.pie(runbook_df, names="Runbook", values="Issues",
+                  title="Issues per Runbook")
+
+
+@st.cache_data
+def make_score_radar(scores):
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(
+        r=list(scores.values()),
+        theta=list(scores.keys()),
+        fill='toself',
+        name='Scores'
+    ))
+    fig.update_layout(
+        polar=dict(radialaxis=dict(visible=True, range=[0, 100])),
+        showlegend=False,
+        title="Score Breakdown"
+    )
+    return fig
+
+
+@st.fragment
+def render_dashboard(analysis_data):
+    """Render the dashboard metrics and charts for one analysis run."""
+    health_summary = analysis_data["health_summary"]
+    analyses = analysis_data["analyses"]
+
+    # Key metrics
+    col1, col2, col3, col4, col5 = st.columns(5)
+
+    with col1:
+        st.metric("Overall Health", f"{health_summary['overall_health']:.1f}%")
+    with col2:
+        st.metric("Completeness", f"{health_summary['average_completeness']:.1f}%")
+    with col3:
+        st.metric("Structure", f"{health_summary['average_structure']:.1f}%")
+    with col4:
+        st.metric("Safety", f"{health_summary['average_safety']:.1f}%")
+    with col5:
+        st.metric("Clarity", f"{health_summary['average_clarity']:.1f}%")
+
+    st.markdown("---")
+
+    # Health breakdown chart
+    st.subheader("Health Score Breakdown")
+    st.plotly_chart(make_health_bar(health_summary), use_container_width=True)
+
+    # Individual runbook scores
+    st.subheader("Individual Runbook Scores")
+    runbook_df = pd.DataFrame.from_records(
+        [
+            {
+                "Runbook": a.filename,
+                "Overall Score": a.overall_score,
+                "Issues": len(a.issues),
+                "Recommendations": len(a.recommendations)
+            }
+            for a in analyses
+        ],
+        columns=["Runbook", "Overall Score", "Issues", "Recommendations"]
+    )
+
+    # Color coding for scores, computed for the whole column at once
+    scores = runbook_df["Overall Score"].to_numpy()
+    colors = np.select(
+        [scores >= 80, scores >= 60],
+        ['background-color: #d4edda; color: #155724',
+         'background-color: #fff3cd; color: #856404'],
+        default='background-color: #f8d7da; color: #721c24'
+    )
+
+    styled_df = runbook_df.style.apply(lambda col: colors, subset=["Overall Score"])
+    st.dataframe(styled_df, use_container_width=True)
+
+    # Issues distribution
+    st.subheader("Issues Distribution")
+    st.plotly_chart(make_issues_pie(runbook_df), use_container_width=True)
+
 
+# Initialize session state
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 
 if 'analysis_data' not in st.session_state:
     st.session_state.analysis_data = None
 
-if 'uploaded_documents' not in st.session_state:
-    st.session_state.uploaded_documents = []
+# Uploaded documents are private to the browser session that uploaded them
+if 'upload_session' not in st.session_state:
+    st.session_state.upload_session = uuid.uuid4().hex
 
 # Sidebar
 st.sidebar.title("🤖 AI Runbook Agent")
@@ -39,37 +276,19 @@ st.sidebar.markdown("---")
 
 # Document upload in sidebar (global)
 st.sidebar.subheader("📤 Document Upload")
-uploaded_file = st.sidebar.file_uploader(
-    "Upload runbook documents:",
-    type=['pdf', 'md', 'txt'],
-    help="Upload documents for chatbot to reference"
-)
-
-if uploaded_file is not None:
-    # Create uploads directory if it doesn't exist
-    upload_dir = os.path.join(os.path.dirname(__file__), "uploads")
-    os.makedirs(upload_dir, exist_ok=True)
-
-    # Save uploaded file
-    file_path = os.path.join(upload_dir, uploaded_file.name)
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-
-    st.sidebar.success(f"✅ {uploaded_file.name} uploaded!")
-
-    # Store uploaded document in session state
-    if 'uploaded_documents' not in st.session_state:
-        st.session_state.uploaded_documents = []
-    st.session_state.uploaded_documents.append({
-        'name': uploaded_file.name,
-        'path': file_path,
-        'content': uploaded_file.getvalue().decode('utf-8', errors='ignore')
-    })
+with st.sidebar:
+    render_uploader(
+        "sidebar_upload",
+        "Upload runbook documents:",
+        ['pdf', 'md', 'txt'],
+        "Upload documents for chatbot to reference"
+    )
 
 # Show uploaded documents in sidebar
-if 'uploaded_documents' in st.session_state and st.session_state.uploaded_documents:
+uploaded_documents = read_index(UPLOAD_DIR, st.session_state.upload_session)
+if uploaded_documents:
     st.sidebar.subheader("📋 Uploaded Documents")
-    for i, doc in enumerate(st.session_state.uploaded_documents):
+    for i, doc in enumerate(uploaded_documents):
         st.sidebar.write(f"📄 {doc['name']}")
 
 st.sidebar.markdown("---")
@@ -85,63 +304,19 @@ st.sidebar.markdown("---")
 
 # Document Upload Section
 st.sidebar.subheader("📄 Document Upload")
-uploaded_file = st.sidebar.file_uploader(
-    "Upload runbook or document",
-    type=['md', 'txt', 'pdf', 'docx'],
-    help="Upload documents for chatbot analysis"
-)
-
-if uploaded_file is not None:
-    # Save uploaded file temporarily
-    upload_dir = os.path.join(os.path.dirname(__file__), "uploads")
-    os.makedirs(upload_dir, exist_ok=True)
-
-    file_path = os.path.join(upload_dir, uploaded_file.name)
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-
-    st.sidebar.success(f"✅ {uploaded_file.name} uploaded successfully!")
-
-    # Store uploaded document in session state
-    if 'uploaded_documents' not in st.session_state:
-        st.session_state.uploaded_documents = []
-    st.session_state.uploaded_documents.append({
-        'name': uploaded_file.name,
-        'path': file_path,
-        'content': uploaded_file.getvalue().decode('utf-8', errors='ignore')
-    })
+with st.sidebar:
+    render_uploader(
+        "sidebar_document_upload",
+        "Upload runbook or document",
+        ['md', 'txt', 'pdf', 'docx'],
+        "Upload documents for chatbot analysis"
+    )
 
 st.sidebar.markdown("---")
 
 # Quick actions
-st.sidebar.subheader("Quick Actions")
-if st.sidebar.button("🔄 Analyze All Runbooks"):
-    with st.spinner("Analyzing runbooks..."):
-        analyzer = RunbookAnalyzer()
-        runbook_dir = os.path.join(os.path.dirname(__file__), "runbooks")
-        analyses = analyzer.analyze_all_runbooks(runbook_dir)
-        health_summary = analyzer.get_health_summary(analyses)
-        st.session_state.analysis_data = {
-            "analyses": analyses,
-            "health_summary": health_summary,
-            "timestamp": datetime.now()
-        }
-    st.sidebar.success("Analysis complete!")
-
-if st.sidebar.button("🗑️ Clear Chat History"):
-    st.session_state.messages = []
-    st.session_state.chatbot.reset_conversation()
-    st.sidebar.success("Chat history cleared!")
-
-if st.sidebar.button("🗂️ Clear Uploaded Documents"):
-    if 'uploaded_documents' in st.session_state:
-        st.session_state.uploaded_documents = []
-    # Clean up uploaded files
-    upload_dir = os.path.join(os.path.dirname(__file__), "uploads")
-    if os.path.exists(upload_dir):
-        import shutil
-        shutil.rmtree(upload_dir)
-    st.sidebar.success("Uploaded documents cleared!")
+with st.sidebar:
+    render_sidebar_actions()
 
 st.sidebar.markdown("---")
 st.sidebar.markdown("""
@@ -162,79 +337,30 @@ if mode == "💬 Chatbot":
     st.subheader("📎 Upload Documents for Context")
     st.markdown("Upload runbooks, documentation, or other files to provide additional context for the chatbot.")
 
-    uploaded_files = st.file_uploader(
+    render_uploader(
+        "chatbot_upload",
         "Choose files",
-        type=['txt', 'md', 'pdf', 'doc', 'docx'],
-        accept_multiple_files=True,
-        help="Upload documents that the chatbot can reference when answering your questions"
+        ['txt', 'md', 'pdf', 'doc', 'docx'],
+        "Upload documents that the chatbot can reference when answering your questions",
+        accept_multiple_files=True
     )
 
-    if uploaded_files:
-        # Process uploaded files
-        upload_dir = os.path.join(os.path.dirname(__file__), "uploads")
-        os.makedirs(upload_dir, exist_ok=True)
-
-        for uploaded_file in uploaded_files:
-            file_path = os.path.join(upload_dir, uploaded_file.name)
-
-            # Save the uploaded file
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-
-            # Extract text content based on file type
-            content = ""
-            if uploaded_file.name.endswith('.txt'):
-                content = uploaded_file.getvalue().decode('utf-8')
-            elif uploaded_file.name.endswith('.md'):
-                content = uploaded_file.getvalue().decode('utf-8')
-            elif uploaded_file.name.endswith('.pdf'):
-                # For PDF, we'll use a simple text extraction
-                try:
-                    from pypdf import PdfReader
-                    pdf_reader = PdfReader(file_path)
-                    content = ""
-                    for page in pdf_reader.pages:
-                        content += page.extract_text() + "\n"
-                except Exception as e:
-                    content = f"Error reading PDF: {str(e)}"
-            else:
-                # For other file types, try to read as text
-                try:
-                    content = uploaded_file.getvalue().decode('utf-8')
-                except:
-                    content = f"Unable to extract text from {uploaded_file.name}"
-
-            # Add to session state
-            doc_info = {
-                'name': uploaded_file.name,
-                'path': file_path,
-                'content': content,
-                'size': len(content)
-            }
-
-            # Check if document already exists
-            existing_names = [doc['name'] for doc in st.session_state.uploaded_documents]
-            if uploaded_file.name not in existing_names:
-                st.session_state.uploaded_documents.append(doc_info)
-
-        st.success(f"Successfully uploaded {len(uploaded_files)} document(s)!")
-
     # Display uploaded documents
-    if st.session_state.uploaded_documents:
+    uploaded_documents = read_index(UPLOAD_DIR, st.session_state.upload_session)
+    if uploaded_documents:
         st.subheader("📋 Uploaded Documents")
-        for i, doc in enumerate(st.session_state.uploaded_documents):
+        for i, doc in enumerate(uploaded_documents):
             col1, col2, col3 = st.columns([3, 1, 1])
             with col1:
                 st.write(f"📄 {doc['name']}")
             with col2:
-                st.write(f"{len(doc['content'])} chars")
+                st.write(f"{doc['size']} bytes")
             with col3:
                 if st.button(f"Remove {i}", key=f"remove_{i}"):
-                    # Remove file from disk
-                    if os.path.exists(doc['path']):
-                        os.remove(doc['path'])
-                    # Remove from session state
-                    st.session_state.uploaded_documents.pop(i)
+                    # Remove file (and any extracted text) from disk
+                    delete_upload(doc['path'])
+                    # Remove from the uploads index
+                    remove_from_index(UPLOAD_DIR, st.session_state.upload_session, doc['sha256'])
                     st.rerun()
 
     st.markdown("---")
@@ -248,45 +374,48 @@ if mode == "💬 Chatbot":
                 if "mode" in message:
                     st.caption(f"Mode: {message['mode']}")
 
-    # Chat input
+    # Chat input: only the new turn is drawn, the history above is left as is
     if prompt := st.chat_input("Ask me about runbooks, incidents, or need help..."):
-        # Add user message to chat history
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        with chat_container:
+            with st.chat_message("user"):
+                st.markdown(prompt)
 
-        # Get uploaded documents for context
-        uploaded_documents = st.session_state.get('uploaded_documents', [])
+        # Get uploaded documents for context, loading their text lazily
+        uploaded_documents = [
+            {**doc, 'content': load_doc_text(doc['path'])}
+            for doc in read_index(UPLOAD_DIR, st.session_state.upload_session)
+        ]
 
         # Get bot response with uploaded documents context
-        with st.spinner("Thinking..."):
-            try:
-                response_data = st.session_state.chatbot.process_message(prompt, uploaded_documents)
-
-                # Add bot response to chat history
-                bot_message = {
-                    "role": "assistant",
-                    "content": response_data["response"],
-                    "mode": response_data.get("mode", "general")
-                }
-                st.session_state.messages.append(bot_message)
-
-                # Store analysis data if available
-                if "analysis_data" in response_data:
-                    st.session_state.analysis_data = response_data["analysis_data"]
-
-            except Exception as e:
-                # Handle errors gracefully
-                error_message = {
-                    "role": "assistant",
-                    "content": f"I apologize, but I encountered an error: {str(e)}. Please try rephrasing your question or contact support if the issue persists.",
-                    "mode": "error"
-                }
-                st.session_state.messages.append(error_message)
-
-        # Rerun to display the new messages
-        st.rerun()
+        with chat_container:
+            with st.chat_message("assistant"):
+                try:
+                    with st.spinner("Thinking..."):
+                        response_data = get_chatbot().stream_message(prompt, uploaded_documents)
+                    response = st.write_stream(response_data["response"])
+                    bot_message = {
+                        "role": "assistant",
+                        "content": response,
+                        "mode": response_data.get("mode", "general")
+                    }
 
-        # Rerun to display the new messages
-        st.rerun()
+                    # Store analysis data if available
+                    if "analysis_data" in response_data:
+                        st.session_state.analysis_data = response_data["analysis_data"]
+
+                except Exception as e:
+                    # Handle errors gracefully
+                    bot_message = {
+                        "role": "assistant",
+                        "content": f"I apologize, but I encountered an error: {str(e)}. Please try rephrasing your question or contact support if the issue persists.",
+                        "mode": "error"
+                    }
+                    st.markdown(bot_message["content"])
+                st.caption(f"Mode: {bot_message['mode']}")
+
+        # Add both messages to chat history once the response has been streamed
+        st.session_state.messages.append({"role": "user", "content": prompt})
+        st.session_state.messages.append(bot_message)
 
 elif mode == "📊 Dashboard":
     st.title("📊 Runbook Health Dashboard")
@@ -294,124 +423,39 @@ elif mode == "📊 Dashboard":
     if st.session_state.analysis_data is None:
         st.info("No analysis data available. Click 'Analyze All Runbooks' in the sidebar to generate a health report.")
     else:
-        analysis_data = st.session_state.analysis_data
-        health_summary = analysis_data["health_summary"]
-        analyses = analysis_data["analyses"]
-
-        # Key metrics
-        col1, col2, col3, col4, col5 = st.columns(5)
-
-        with col1:
-            st.metric("Overall Health", f"{health_summary['overall_health']:.1f}%")
-        with col2:
-            st.metric("Completeness", f"{health_summary['average_completeness']:.1f}%")
-        with col3:
-            st.metric("Structure", f"{health_summary['average_structure']:.1f}%")
-        with col4:
-            st.metric("Safety", f"{health_summary['average_safety']:.1f}%")
-        with col5:
-            st.metric("Clarity", f"{health_summary['average_clarity']:.1f}%")
-
-        st.markdown("---")
-
-        # Health breakdown chart
-        st.subheader("Health Score Breakdown")
-        health_df = pd.DataFrame({
-            "Category": ["Completeness", "Structure", "Safety", "Clarity"],
-            "Score": [
-                health_summary["average_completeness"],
-                health_summary["average_structure"],
-                health_summary["average_safety"],
-                health_summary["average_clarity"]
-            ]
-        })
-
-        fig = px.bar(health_df, x="Category", y="Score",
-                    title="Average Health Scores by Category",
-                    color="Score",
-                    color_continuous_scale="RdYlGn")
-        fig.update_layout(yaxis_range=[0, 100])
-        st.plotly_chart(fig, use_container_width=True)
-
-        # Individual runbook scores
-        st.subheader("Individual Runbook Scores")
-        runbook_df = pd.DataFrame({
-            "Runbook": [a.filename for a in analyses],
-            "Overall Score": [a.overall_score for a in analyses],
-            "Issues": [len(a.issues) for a in analyses],
-            "Recommendations": [len(a.recommendations) for a in analyses]
-        })
-
-        # Color coding for scores
-        def color_score(val):
-            if val >= 80:
-                return 'background-color: #d4edda; color: #155724'
-            elif val >= 60:
-                return 'background-color: #fff3cd; color: #856404'
-            else:
-                return 'background-color: #f8d7da; color: #721c24'
-
-        styled_df = runbook_df.style.applymap(color_score, subset=["Overall Score"])
-        st.dataframe(styled_df, use_container_width=True)
-
-        # Issues distribution
-        st.subheader("Issues Distribution")
-        issues_fig = px.pie(runbook_df, names="Runbook", values="Issues",
-                           title="Issues per Runbook")
-        st.plotly_chart(issues_fig, use_container_width=True)
+        render_dashboard(st.session_state.analysis_data)
 
 elif mode == "📋 Runbook Analysis":
     st.title("📋 Detailed Runbook Analysis")
 
     # Document upload section
     st.subheader("📤 Upload Custom Documents")
-    uploaded_file = st.file_uploader(
+    render_uploader(
+        "analysis_upload",
         "Upload runbook documents (PDF, MD, TXT) for analysis:",
-        type=['pdf', 'md', 'txt'],
-        help="Upload your own runbook documents to analyze them"
+        ['pdf', 'md', 'txt'],
+        "Upload your own runbook documents to analyze them"
     )
 
-    if uploaded_file is not None:
-        # Create uploads directory if it doesn't exist
-        upload_dir = os.path.join(os.path.dirname(__file__), "uploads")
-        os.makedirs(upload_dir, exist_ok=True)
-
-        # Save uploaded file
-        file_path = os.path.join(upload_dir, uploaded_file.name)
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-
-        st.success(f"✅ {uploaded_file.name} uploaded successfully!")
-
-        # Store uploaded document in session state
-        if 'uploaded_documents' not in st.session_state:
-            st.session_state.uploaded_documents = []
-        st.session_state.uploaded_documents.append({
-            'name': uploaded_file.name,
-            'path': file_path,
-            'content': uploaded_file.getvalue().decode('utf-8', errors='ignore')
-        })
-
     # Show uploaded documents
-    if 'uploaded_documents' in st.session_state and st.session_state.uploaded_documents:
+    uploaded_documents = read_index(UPLOAD_DIR, st.session_state.upload_session)
+    if uploaded_documents:
         st.subheader("📋 Uploaded Documents")
-        for i, doc in enumerate(st.session_state.uploaded_documents):
+        for i, doc in enumerate(uploaded_documents):
             col1, col2 = st.columns([3, 1])
             with col1:
                 st.write(f"📄 {doc['name']}")
             with col2:
                 if st.button(f"Remove {i+1}", key=f"remove_{i}"):
-                    # Remove from session state
-                    st.session_state.uploaded_documents.pop(i)
-                    # Remove file
-                    if os.path.exists(doc['path']):
-                        os.remove(doc['path'])
+                    # Remove from the uploads index
+                    remove_from_index(UPLOAD_DIR, st.session_state.upload_session, doc['sha256'])
+                    # Remove file (and any extracted text)
+                    delete_upload(doc['path'])
                     st.rerun()
 
     # Get list of runbooks
-    runbook_dir = os.path.join(os.path.dirname(__file__), "runbooks")
-    if os.path.exists(runbook_dir):
-        runbooks = [f for f in os.listdir(runbook_dir) if f.endswith('.md')]
+    if os.path.exists(RUNBOOK_DIR):
+        runbooks = list_runbooks(RUNBOOK_DIR, os.path.getmtime(RUNBOOK_DIR))
 
         if runbooks:
             st.subheader("📖 Built-in Runbooks")
@@ -419,9 +463,8 @@ elif mode == "📋 Runbook Analysis":
 
             if selected_runbook:
                 # Analyze selected runbook
-                analyzer = RunbookAnalyzer()
-                runbook_path = os.path.join(runbook_dir, selected_runbook)
-                analysis = analyzer.analyze_runbook(runbook_path)
+                runbook_path = os.path.join(RUNBOOK_DIR, selected_runbook)
+                analysis = get_analyzer().analyze_runbook(runbook_path)
 
                 # Display analysis results
                 col1, col2 = st.columns([1, 2])
@@ -441,20 +484,7 @@ elif mode == "📋 Runbook Analysis":
                         "Safety": analysis.safety_score,
                         "Clarity": analysis.clarity_score
                     }
-
-                    fig = go.Figure()
-                    fig.add_trace(go.Scatterpolar(
-                        r=list(scores.values()),
-                        theta=list(scores.keys()),
-                        fill='toself',
-                        name='Scores'
-                    ))
-                    fig.update_layout(
-                        polar=dict(radialaxis=dict(visible=True, range=[0, 100])),
-                        showlegend=False,
-                        title="Score Breakdown"
-                    )
-                    st.plotly_chart(fig)
+                    st.plotly_chart(make_score_radar(scores))
 
                 with col2:
                     # Issues and recommendations
@@ -475,15 +505,15 @@ elif mode == "📋 Runbook Analysis":
                 # Metadata
                 if analysis.metadata:
                     st.subheader("Runbook Metadata")
-                    meta_df = pd.DataFrame(list(analysis.metadata.items()),
-                                         columns=["Property", "Value"])
-                    st.table(meta_df)
+                    st.table({
+                        "Property": list(analysis.metadata.keys()),
+                        "Value": list(analysis.metadata.values())
+                    })
 
                 # Display runbook content
                 st.subheader("Runbook Content")
                 try:
-                    with open(runbook_path, 'r') as f:
-                        content = f.read()
+                    content = read_markdown(runbook_path, os.path.getmtime(runbook_path))
                     st.code(content, language="markdown")
                 except Exception as e:
                     st.error(f"Error reading runbook: {e}")
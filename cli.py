@@ -1,16 +1,10 @@
 import sys
 import os
 import argparse
-import subprocess
-from dotenv import load_dotenv
 
-# Add src to path
+# Add src to path. Project modules (and dotenv) are imported inside the
+# branches that need them so e.g. `--web` does not pay for the agent stack.
 sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
-from agent import RunbookAgent
-from ingest import ingest_runbooks
-from analyzer import RunbookAnalyzer
-
-load_dotenv()
 
 def main():
     parser = argparse.ArgumentParser(description="AI Runbook Agent CLI")
@@ -23,11 +17,13 @@ def main():
     args = parser.parse_args()
 
     if args.ingest:
+        from ingest import ingest_runbooks
         ingest_runbooks()
         print("Ingestion complete.")
         return
 
     if args.analyze:
+        from analyzer import RunbookAnalyzer
         print("Analyzing all runbooks...")
         analyzer = RunbookAnalyzer()
         runbook_dir = os.path.join(os.path.dirname(__file__), "runbooks")
@@ -72,6 +68,7 @@ def main():
             print(f"Error: File '{args.analyze_file}' not found.")
             return
 
+        from analyzer import RunbookAnalyzer
         print(f"Analyzing runbook: {args.analyze_file}")
         analyzer = RunbookAnalyzer()
         analysis = analyzer.analyze_runbook(args.analyze_file)
@@ -104,8 +101,11 @@ def main():
     if args.web:
         print("Launching web interface...")
         try:
-            subprocess.run([sys.executable, "-m", "streamlit", "run", "app.py"], check=True)
-        except subprocess.CalledProcessError as e:
+            # Run Streamlit in-process instead of spawning a second interpreter
+            from streamlit.web import bootstrap
+            bootstrap.load_config_options(flag_options={})
+            bootstrap.run(os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py"), False, [], {})
+        except ImportError as e:
             print(f"Error launching web interface: {e}")
             print("Make sure Streamlit is installed: pip install streamlit")
         except KeyboardInterrupt:
@@ -113,6 +113,8 @@ def main():
         return
 
     if args.alert:
+        from dotenv import load_dotenv
+        load_dotenv()
         api_key = os.getenv("GOOGLE_API_KEY")
         if not api_key or api_key == "your_api_key_here":
             print("Error: GOOGLE_API_KEY not set in .env file.")
@@ -127,6 +129,7 @@ def main():
         print("Analyzing...")
 
         try:
+            from agent import RunbookAgent
             agent = RunbookAgent()
             response = agent.handle_alert(args.alert)
             print("\n" + "="*50)
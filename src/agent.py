@@ -1,24 +1,48 @@
 from __future__ import annotations
 
+import functools
+import math
 import os
 import re
-from typing import List, Optional, Tuple
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
 
 from analyzer import RunbookAnalyzer
+from ingest import DEFAULT_INDEX_PATH, build_index, load_index, tokenize
+from io_utils import read_text, scan_markdown
+
+
+# Okapi BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+@functools.lru_cache(maxsize=256)
+def _load_text(path: str, mtime_ns: int) -> str:
+    """Content of a runbook; keyed by mtime so edits are picked up."""
+    return read_text(path)
 
 
 class RunbookAgent:
     """Incident response agent (offline-capable).
 
-    For now this does retrieval using simple keyword matching over built-in
+    For now this does retrieval using BM25 keyword ranking over built-in
     runbooks. This keeps the agent usable without any API keys or vector DB.
     """
 
-    def __init__(self, runbook_dir: Optional[str] = None):
+    # Everything after "## Name" until the next "## ", per extracted section
+    _SECTION_RES = {
+        name: re.compile(rf"^\s*##\s+{re.escape(name)}\s*$\n(.*?)(?=^\s*##\s+|\Z)", re.M | re.S)
+        for name in ("Diagnosis", "Remediation", "Rollback")
+    }
+
+    def __init__(self, runbook_dir: Optional[str] = None, index_path: Optional[str] = None):
         self.runbook_dir = runbook_dir or os.path.join(
             os.path.dirname(os.path.dirname(__file__)), "runbooks"
         )
         self.analyzer = RunbookAnalyzer()
+        # Inverted index written by `ingest_runbooks`, used while it is fresh
+        self._index: Optional[Dict[str, Any]] = self._load_index(index_path or DEFAULT_INDEX_PATH)
 
     def handle_alert(self, alert_text: str) -> str:
         runbook_path = self._find_best_runbook(alert_text)
@@ -29,7 +53,7 @@ class RunbookAgent:
                 "or add a new markdown runbook under `runbooks/`."
             )
 
-        content = self._read_text(runbook_path)
+        content = _load_text(runbook_path, os.stat(runbook_path).st_mtime_ns)
         _, body = self.analyzer._parse_frontmatter(content)  # reuse parser
         steps = self._extract_sections(body)
 
@@ -58,45 +82,56 @@ class RunbookAgent:
         if not os.path.isdir(self.runbook_dir):
             return None
 
-        alert_tokens = self._tokens(alert_text)
-        best: Tuple[int, Optional[str]] = (0, None)
-
-        for name in os.listdir(self.runbook_dir):
-            if not name.lower().endswith(".md"):
+        alert_tokens = list(dict.fromkeys(self._tokens(alert_text)))
+        index = self._ensure_index()
+        postings = index["postings"]
+        docs = index["docs"]
+        n = len(docs)
+        avgdl = index["avgdl"] or 1.0
+
+        # BM25: only the postings of the query terms are visited
+        scores: Dict[str, float] = defaultdict(float)
+        for t in alert_tokens:
+            plist = postings.get(t)
+            if not plist:
                 continue
-            path = os.path.join(self.runbook_dir, name)
-            content = self._read_text(path)
-            score = self._keyword_score(alert_tokens, content)
-            if score > best[0]:
-                best = (score, path)
-
+            idf = math.log((n - len(plist) + 0.5) / (len(plist) + 0.5) + 1)
+            for doc_id, tf in plist:
+                dl = docs[doc_id]["len"]
+                scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * dl / avgdl))
+
+        best: Tuple[float, Optional[str]] = (0.0, None)
+        for doc_id in sorted(scores):
+            if scores[doc_id] > best[0]:
+                best = (scores[doc_id], docs[doc_id]["path"])
         return best[1]
 
-    def _keyword_score(self, alert_tokens: List[str], content: str) -> int:
-        hay = content.lower()
-        return sum(1 for t in alert_tokens if t and t in hay)
+    def _ensure_index(self) -> Dict[str, Any]:
+        """Return an index matching the runbooks on disk, rebuilding it if stale."""
+        current = {e.path: e.stat().st_mtime_ns for e in scan_markdown(self.runbook_dir)}
+        index = self._index
+        if index is not None and {d["path"]: d["mtime_ns"] for d in index["docs"].values()} == current:
+            return index
+
+        index = build_index({path: _load_text(path, mtime) for path, mtime in current.items()})
+        self._index = index
+        return index
+
+    def _load_index(self, index_path: str) -> Optional[Dict[str, Any]]:
+        try:
+            data = load_index(index_path)
+        except (OSError, ValueError):
+            return None
+        if "postings" not in data or "docs" not in data:
+            return None
+        return {"postings": data["postings"], "docs": data["docs"], "avgdl": data.get("avgdl", 0.0)}
 
     def _tokens(self, text: str) -> List[str]:
-        toks = re.findall(r"[a-zA-Z0-9_]+", text.lower())
-        # drop very short tokens
-        return [t for t in toks if len(t) >= 3]
+        return tokenize(text)
 
     def _extract_sections(self, body: str) -> Tuple[str, str, str]:
         def section(name: str) -> str:
-            # Grab everything after "## Name" until next "## "
-            pattern = re.compile(rf"^\s*##\s+{re.escape(name)}\s*$\n(.*?)(?=^\s*##\s+|\Z)", re.M | re.S)
-            m = pattern.search(body)
+            m = self._SECTION_RES[name].search(body)
             return (m.group(1).strip() if m else "")
 
         return section("Diagnosis"), section("Remediation"), section("Rollback")
-
-    def _read_text(self, path: str) -> str:
-        for enc in ("utf-8", "utf-8-sig", "cp1252"):
-            try:
-                with open(path, "r", encoding=enc) as f:
-                    return f.read()
-            except UnicodeDecodeError:
-                continue
-        with open(path, "r", encoding="utf-8", errors="replace") as f:
-            return f.read()
-
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+import functools
+import mmap
 import os
 import re
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from io_utils import decode_text, scan_markdown
 
 
 @dataclass
@@ -27,25 +32,123 @@ class RunbookAnalyzer:
     criteria (completeness/structure/safety/clarity).
     """
 
-    REQUIRED_SECTIONS = ("diagnosis", "remediation", "rollback")
+    REQUIRED_SECTIONS = frozenset({"diagnosis", "remediation", "rollback"})
     REQUIRED_METADATA_KEYS = ("title", "version", "service_owner", "severity", "trigger_criteria")
+    # RunbookAnalysis score fields and the health summary keys they average into
+    HEALTH_SCORE_FIELDS = (
+        "overall_score",
+        "completeness_score",
+        "structure_score",
+        "safety_score",
+        "clarity_score",
+    )
+    HEALTH_SUMMARY_KEYS = (
+        "overall_health",
+        "average_completeness",
+        "average_structure",
+        "average_safety",
+        "average_clarity",
+    )
 
     _H2_RE = re.compile(r"^\s*##\s+(.+?)\s*$", re.MULTILINE)
     _YAML_FRONTMATTER_RE = re.compile(r"^\s*---\s*\n(.*?)\n---\s*\n", re.DOTALL)
+    # `key: value` lines of the frontmatter; comment lines are skipped
+    _YAML_KV_RE = re.compile(r"^[ \t]*(?![ \t#])([^:\n]*):(.*)$", re.MULTILINE)
+    # Larger frontmatter blocks are parsed without being memoized
+    _FRONTMATTER_CACHE_MAX_CHARS = 4096
+    _STEP_RE = re.compile(r"^\s*(?:\d+\.|[-*])\s+")
+    _DESTRUCTIVE_RE = re.compile(
+        r"\brm\s+-rf\b|\b(?:drop\s+(?:database|table)|delete\s+from|kill\s+-9|shutdown|reboot)\b", re.I
+    )
+    # Every keyword check used by the scorers, fused so the body is scanned once.
+    _SCAN_RE = re.compile(
+        r"(?P<trigger>trigger\s*criteria)"
+        r"|(?P<validate>\b(?:validate|verification|verify|check)\b)"
+        r"|(?P<confirm>\b(?:confirm|are you sure|double[- ]check|approval)\b)"
+        r"|(?P<escalate>\b(?:escalat|on[- ]call|owner|contact)\b)"
+        rf"|(?P<destructive>{_DESTRUCTIVE_RE.pattern})"
+        r"|(?P<safety>\b(?:safety|warning|caution)\b)",
+        re.I,
+    )
+    # Byte-pattern twins of the above, used to score files straight from an mmap.
+    # On printable ASCII they match exactly what the str patterns match; any
+    # other byte (a BOM, non-ASCII text, control characters) means the file
+    # goes through the decoded path instead.
+    _NEEDS_DECODE_RE = re.compile(rb"[^\t\n\r\x20-\x7e]")
+    _H2_BYTES_RE = re.compile(_H2_RE.pattern.encode(), re.MULTILINE)
+    _YAML_FRONTMATTER_BYTES_RE = re.compile(_YAML_FRONTMATTER_RE.pattern.encode(), re.DOTALL)
+    _STEP_BYTES_RE = re.compile(_STEP_RE.pattern.encode())
+    _SCAN_BYTES_RE = re.compile(_SCAN_RE.pattern.encode(), re.I)
+
+    def __init__(self) -> None:
+        # path -> (mtime_ns, size, analysis); an edited file replaces its entry.
+        self._cache: Dict[str, Tuple[int, int, RunbookAnalysis]] = {}
 
     def analyze_runbook(self, runbook_path: str) -> RunbookAnalysis:
         if not os.path.exists(runbook_path):
             raise FileNotFoundError(runbook_path)
 
-        content = self._read_text(runbook_path)
+        return self._analyze_cached(runbook_path, os.stat(runbook_path))
+
+    def _analyze_cached(self, runbook_path: str, st: os.stat_result) -> RunbookAnalysis:
+        cached = self._cache.get(runbook_path)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            analysis = cached[2]
+        else:
+            analysis = self._analyze_file(runbook_path)
+            self._cache[runbook_path] = (st.st_mtime_ns, st.st_size, analysis)
+        # Callers may modify what they get back; don't hand out the cached analysis.
+        return replace(
+            analysis,
+            issues=list(analysis.issues),
+            recommendations=list(analysis.recommendations),
+            metadata=dict(analysis.metadata),
+        )
+
+    def analyze_content(self, name: str, content: str) -> RunbookAnalysis:
+        """Analyze runbook text that is already in memory (e.g. an upload)."""
         metadata, body = self._parse_frontmatter(content)
         headings = [h.strip().lower() for h in self._H2_RE.findall(body)]
+        return self._analyze(name, metadata, body, headings)
+
+    def analyze_runbook_bytes(self, runbook_path: str, data: Union[bytes, mmap.mmap]) -> RunbookAnalysis:
+        """Analyze a runbook from bytes (or an mmap) the caller already has for `runbook_path`."""
+        return self._analyze_bytes(os.path.basename(runbook_path), data)
+
+    def _analyze_file(self, runbook_path: str) -> RunbookAnalysis:
+        name = os.path.basename(runbook_path)
+        with open(runbook_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return self.analyze_content(name, "")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return self._analyze_bytes(name, mm)
+
+    def _analyze_bytes(self, name: str, data: Union[bytes, mmap.mmap]) -> RunbookAnalysis:
+        # Plain-ASCII runbooks are scored on their raw bytes; only the
+        # frontmatter and the headings are decoded.
+        if self._NEEDS_DECODE_RE.search(data):
+            return self.analyze_content(name, decode_text(data[:]))
+        m = self._YAML_FRONTMATTER_BYTES_RE.match(data)
+        if m:
+            metadata = self._parse_metadata(m.group(1).decode("ascii"))
+            body = data[m.end() :]
+        else:
+            metadata = {}
+            body = data[:]
+        headings = [h.decode("ascii").strip().lower() for h in self._H2_BYTES_RE.findall(body)]
+        return self._analyze(name, metadata, body, headings)
+
+    def _analyze(
+        self, name: str, metadata: Dict[str, str], body: Union[str, bytes], headings: List[str]
+    ) -> RunbookAnalysis:
+        heading_set = set(headings)
+        found = self._scan_keywords(body)
 
         completeness, completeness_issues, completeness_recs = self._score_completeness(
-            metadata, body, headings
+            metadata, found, heading_set
         )
         structure, structure_issues, structure_recs = self._score_structure(metadata, body, headings)
-        safety, safety_issues, safety_recs = self._score_safety(body, headings)
+        safety, safety_issues, safety_recs = self._score_safety(found, heading_set)
         clarity, clarity_issues, clarity_recs = self._score_clarity(body)
 
         issues = [*completeness_issues, *structure_issues, *safety_issues, *clarity_issues]
@@ -54,7 +157,7 @@ class RunbookAnalyzer:
         overall = (completeness + structure + safety + clarity) / 4.0
 
         return RunbookAnalysis(
-            filename=os.path.basename(runbook_path),
+            filename=name,
             overall_score=overall,
             completeness_score=completeness,
             structure_score=structure,
@@ -68,17 +171,24 @@ class RunbookAnalyzer:
     def analyze_all_runbooks(self, runbook_dir: str) -> List[RunbookAnalysis]:
         if not os.path.isdir(runbook_dir):
             return []
-        analyses: List[RunbookAnalysis] = []
-        for name in sorted(os.listdir(runbook_dir)):
-            if not name.lower().endswith(".md"):
-                continue
-            path = os.path.join(runbook_dir, name)
-            try:
-                analyses.append(self.analyze_runbook(path))
-            except Exception:
-                # Keep batch analysis resilient: skip bad files.
-                continue
-        return analyses
+        return self.analyze_entries(scan_markdown(runbook_dir))
+
+    def analyze_entries(self, entries: Sequence[os.DirEntry]) -> List[RunbookAnalysis]:
+        """Analyze runbooks from `os.scandir` entries, reusing their cached stat results."""
+        if not entries:
+            return []
+        # Each file is analyzed independently; threads overlap the reads and regex scans.
+        workers = min(32, (os.cpu_count() or 1) * 4, len(entries))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return [a for a in executor.map(self._try_analyze, entries) if a is not None]
+
+    def _try_analyze(self, entry: os.DirEntry) -> Optional[RunbookAnalysis]:
+        try:
+            # The DirEntry's cached stat result doubles as the cache key.
+            return self._analyze_cached(entry.path, entry.stat())
+        except Exception:
+            # Keep batch analysis resilient: skip bad files.
+            return None
 
     def get_health_summary(self, analyses: List[RunbookAnalysis]) -> Dict[str, float]:
         if not analyses:
@@ -101,19 +211,30 @@ class RunbookAnalyzer:
             "average_clarity": avg([a.clarity_score for a in analyses]),
         }
 
+    def get_health_summary_fast(self, scores: Any) -> Dict[str, float]:
+        """`get_health_summary` over an (n, 5) NumPy score matrix.
+
+        Columns follow `HEALTH_SCORE_FIELDS`, one row per analysis; the
+        averages are computed in a single vectorized reduction.
+        """
+        if len(scores) == 0:
+            return self.get_health_summary([])
+        means = scores.mean(axis=0)
+        return {key: float(mean) for key, mean in zip(self.HEALTH_SUMMARY_KEYS, means)}
+
     # -----------------------
     # Scoring helpers
     # -----------------------
 
     def _score_completeness(
-        self, metadata: Dict[str, str], body: str, headings: List[str]
+        self, metadata: Dict[str, str], found: Set[str], heading_set: Set[str]
     ) -> Tuple[float, List[str], List[str]]:
         issues: List[str] = []
         recs: List[str] = []
         score = 0.0
 
         # Trigger criteria (metadata or text)
-        if metadata.get("trigger_criteria") or re.search(r"trigger\s*criteria", body, re.I):
+        if metadata.get("trigger_criteria") or "trigger" in found:
             score += 25.0
         else:
             issues.append("Missing trigger criteria (when to use this runbook).")
@@ -121,23 +242,22 @@ class RunbookAnalyzer:
 
         # Required sections
         section_points = 25.0
-        present = {s: (s in headings) for s in self.REQUIRED_SECTIONS}
-        if all(present.values()):
+        missing = self.REQUIRED_SECTIONS - heading_set
+        if not missing:
             score += 25.0
         else:
-            missing = [s.title() for s, ok in present.items() if not ok]
-            issues.append(f"Missing required sections: {', '.join(missing)}.")
+            issues.append(f"Missing required sections: {', '.join(s.title() for s in sorted(missing))}.")
             recs.append("Add the missing required sections: Diagnosis, Remediation, Rollback.")
 
         # Validation steps
-        if re.search(r"\b(validate|verification|verify|confirm|check)\b", body, re.I):
+        if "validate" in found:
             score += 25.0
         else:
             issues.append("No explicit validation/verification steps found.")
             recs.append("Add a 'Validation' step after remediation to confirm the issue is resolved.")
 
         # Escalation contacts / owner
-        if metadata.get("service_owner") or re.search(r"\b(escalat|on[- ]call|owner|contact)\b", body, re.I):
+        if metadata.get("service_owner") or "escalate" in found:
             score += 25.0
         else:
             issues.append("No service owner / escalation contact found.")
@@ -146,7 +266,7 @@ class RunbookAnalyzer:
         return score, issues, recs
 
     def _score_structure(
-        self, metadata: Dict[str, str], body: str, headings: List[str]
+        self, metadata: Dict[str, str], body: Union[str, bytes], headings: List[str]
     ) -> Tuple[float, List[str], List[str]]:
         issues: List[str] = []
         recs: List[str] = []
@@ -186,58 +306,59 @@ class RunbookAnalyzer:
 
         return min(100.0, score), issues, recs
 
-    def _score_safety(self, body: str, headings: List[str]) -> Tuple[float, List[str], List[str]]:
+    def _score_safety(self, found: Set[str], heading_set: Set[str]) -> Tuple[float, List[str], List[str]]:
         issues: List[str] = []
         recs: List[str] = []
         score = 100.0
 
-        destructive_patterns = [
-            r"\brm\s+-rf\b",
-            r"\b(drop\s+database|drop\s+table)\b",
-            r"\b(delete\s+from)\b",
-            r"\b(kill\s+-9)\b",
-            r"\bshutdown\b",
-            r"\breboot\b",
-        ]
-        destructive_found = any(re.search(p, body, re.I) for p in destructive_patterns)
-        if destructive_found:
-            if not re.search(r"\b(confirm|are you sure|double[- ]check|approval)\b", body, re.I):
+        if "destructive" in found:
+            if "confirm" not in found:
                 score -= 35.0
                 issues.append("Potentially destructive actions detected without an explicit confirmation/approval step.")
                 recs.append("Add a confirmation/approval step before any destructive command.")
 
-        if "rollback" not in headings:
+        if "rollback" not in heading_set:
             score -= 40.0
             issues.append("No rollback section found (required for safe operations).")
             recs.append("Add a Rollback section with clear recovery steps.")
 
-        if not re.search(r"\b(safety|warning|caution)\b", body, re.I):
+        if "safety" not in found:
             score -= 15.0
             issues.append("No safety warnings/cautions found.")
             recs.append("Add a short 'Safety' note (permissions, impact, maintenance window, backups).")
 
         return max(0.0, min(100.0, score)), issues, recs
 
-    def _score_clarity(self, body: str) -> Tuple[float, List[str], List[str]]:
+    def _score_clarity(self, body: Union[str, bytes]) -> Tuple[float, List[str], List[str]]:
         issues: List[str] = []
         recs: List[str] = []
-
-        lines = [ln.rstrip("\n") for ln in body.splitlines()]
-        non_empty = [ln for ln in lines if ln.strip()]
+        binary = isinstance(body, bytes)
+        step_re = self._STEP_BYTES_RE if binary else self._STEP_RE
+
+        # One pass over the lines: step presence (numbered or bullet lists) and
+        # overlong lines, which can reduce readability
+        non_empty = 0
+        has_steps = False
+        long_lines = 0
+        for ln in body.splitlines():
+            if not ln.strip():
+                continue
+            non_empty += 1
+            if not has_steps and step_re.match(ln):
+                has_steps = True
+            if len(ln) > 140:
+                long_lines += 1
         if not non_empty:
             return 0.0, ["Runbook content is empty."], ["Add clear, step-by-step runbook content."]
 
-        # Step presence: numbered lists or bullet lists
-        has_steps = any(re.match(r"^\s*(\d+\.|\-|\*)\s+", ln) for ln in non_empty)
         # Code fences: improve clarity for commands
-        has_code_fences = "```" in body
-        # Overlong lines can reduce readability
-        long_lines = [ln for ln in non_empty if len(ln) > 140]
+        has_code_fences = (b"```" if binary else "```") in body
+        long_line_threshold = max(3, non_empty // 10)
 
         score = 0.0
         score += 45.0 if has_steps else 20.0
         score += 30.0 if has_code_fences else 15.0
-        score += 25.0 if len(long_lines) <= max(3, len(non_empty) // 10) else 10.0
+        score += 25.0 if long_lines <= long_line_threshold else 10.0
 
         if not has_steps:
             issues.append("No step-by-step list detected (harder to follow during incidents).")
@@ -255,36 +376,44 @@ class RunbookAnalyzer:
     # Parsing helpers
     # -----------------------
 
-    def _read_text(self, path: str) -> str:
-        # Most runbooks will be UTF-8; fall back to Windows-1252 if needed.
-        for enc in ("utf-8", "utf-8-sig", "cp1252"):
-            try:
-                with open(path, "r", encoding=enc) as f:
-                    return f.read()
-            except UnicodeDecodeError:
-                continue
-        with open(path, "r", encoding="utf-8", errors="replace") as f:
-            return f.read()
+    def _scan_keywords(self, body: Union[str, bytes]) -> Set[str]:
+        binary = isinstance(body, bytes)
+        scan_re = self._SCAN_BYTES_RE if binary else self._SCAN_RE
+        validate_prefixes = (b"confirm", b"double") if binary else ("confirm", "double")
+        found: Set[str] = set()
+        for m in scan_re.finditer(body):
+            found.add(m.lastgroup)
+            # "confirm" and "double-check" also count as validation steps; the
+            # fused pattern reports them once, under the confirm group.
+            if m.lastgroup == "confirm" and m.group().lower().startswith(validate_prefixes):
+                found.add("validate")
+        return found
 
     def _parse_frontmatter(self, content: str) -> Tuple[Dict[str, str], str]:
         m = self._YAML_FRONTMATTER_RE.match(content)
         if not m:
             return {}, content
-        raw = m.group(1)
-        body = content[m.end() :]
-        metadata = self._parse_yaml_kv(raw)
-        return metadata, body
-
-    def _parse_yaml_kv(self, raw: str) -> Dict[str, str]:
+        return self._parse_metadata(m.group(1)), content[m.end() :]
+
+    @classmethod
+    def _parse_metadata(cls, raw: str) -> Dict[str, str]:
+        # Only frontmatter blocks (never whole documents) are memoized, and only
+        # small ones, so the cache stays bounded at a few MB.
+        if len(raw) > cls._FRONTMATTER_CACHE_MAX_CHARS:
+            return cls._parse_yaml_kv(raw)
+        # Callers keep the metadata (e.g. on RunbookAnalysis); don't hand out the cached dict.
+        return dict(cls._parse_yaml_kv_cached(raw))
+
+    @classmethod
+    @functools.lru_cache(maxsize=512)
+    def _parse_yaml_kv_cached(cls, raw: str) -> Dict[str, str]:
+        # Shared by every analyzer (and RunbookAgent), keyed by the frontmatter block.
+        return cls._parse_yaml_kv(raw)
+
+    @classmethod
+    def _parse_yaml_kv(cls, raw: str) -> Dict[str, str]:
         # Minimal YAML key:value parser (no nested structures)
-        meta: Dict[str, str] = {}
-        for line in raw.splitlines():
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            if ":" not in line:
-                continue
-            k, v = line.split(":", 1)
-            meta[k.strip()] = v.strip().strip('"').strip("'")
-        return meta
+        return {
+            k.strip(): v.strip().strip('"').strip("'") for k, v in cls._YAML_KV_RE.findall(raw)
+        }
 
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import os
 import re
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 from analyzer import RunbookAnalyzer
 from agent import RunbookAgent
@@ -17,36 +17,54 @@ class RunbookChatbot:
     - General mode: usage guidance
     """
 
+    # Keyword prefixes for each mode, matched in one pass (so "analyze" and
+    # "errors" count, not just the exact stems)
+    _MODE_RE = re.compile(
+        r"(?P<analysis>\b(?:analyz|health|score|review|assess|improv|recommend))"
+        r"|(?P<incident>\b(?:incident|alert|error|failure|latency|timeout|crash|outage))",
+        re.I,
+    )
+
     def __init__(self, runbook_dir: Optional[str] = None):
         self.runbook_dir = runbook_dir or os.path.join(
             os.path.dirname(os.path.dirname(__file__)), "runbooks"
         )
         self.analyzer = RunbookAnalyzer()
         self.agent = RunbookAgent(self.runbook_dir)
-        self._history: List[Dict[str, str]] = []
-
-    def reset_conversation(self) -> None:
-        self._history = []
 
     def process_message(self, message: str, uploaded_documents: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Answer a single message.
+
+        No conversation history is kept on the instance (the caller owns it,
+        e.g. in Streamlit session state), so one chatbot can be shared safely.
+        """
         uploaded_documents = uploaded_documents or []
         mode = self._detect_mode(message)
-        self._history.append({"role": "user", "content": message})
 
         if mode == "analysis":
             response, analysis_data = self._analysis_response(message, uploaded_documents)
-            self._history.append({"role": "assistant", "content": response})
             return {"response": response, "mode": mode, "analysis_data": analysis_data}
 
         if mode == "incident":
             response = self.agent.handle_alert(message)
-            self._history.append({"role": "assistant", "content": response})
             return {"response": response, "mode": mode}
 
         response = self._general_response()
-        self._history.append({"role": "assistant", "content": response})
         return {"response": response, "mode": "general"}
 
+    def stream_message(self, message: str, uploaded_documents: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Like `process_message`, but "response" is an iterator of text chunks.
+
+        Lets the UI write the reply incrementally (e.g. `st.write_stream`).
+        """
+        result = self.process_message(message, uploaded_documents)
+        result["response"] = self._iter_chunks(result["response"])
+        return result
+
+    @staticmethod
+    def _iter_chunks(text: str) -> Iterator[str]:
+        yield from text.splitlines(keepends=True)
+
     # -----------------------
     # Mode handlers
     # -----------------------
@@ -62,13 +80,7 @@ class RunbookChatbot:
             content = doc.get("content", "")
             if not content.strip():
                 continue
-            # Write to a temp file for the analyzer (keeps API stable)
-            tmp_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads_tmp")
-            os.makedirs(tmp_dir, exist_ok=True)
-            tmp_path = os.path.join(tmp_dir, f"{name}.md")
-            with open(tmp_path, "w", encoding="utf-8") as f:
-                f.write(content)
-            analyses.append(self.analyzer.analyze_runbook(tmp_path))
+            analyses.append(self.analyzer.analyze_content(name, content))
 
         # If no uploaded docs, analyze all built-ins
         if not analyses:
@@ -117,10 +129,11 @@ class RunbookChatbot:
     # -----------------------
 
     def _detect_mode(self, message: str) -> str:
-        m = message.lower()
-        if re.search(r"\b(analyz|health|score|review|assess|improv|recommend)\b", m):
-            return "analysis"
-        if re.search(r"\b(incident|alert|error|failure|latency|timeout|crash|outage)\b", m):
-            return "incident"
-        return "general"
+        mode = "general"
+        for m in self._MODE_RE.finditer(message):
+            # Analysis keywords win over incident keywords anywhere in the message.
+            if m.lastgroup == "analysis":
+                return "analysis"
+            mode = "incident"
+        return mode
 
@@ -1,40 +1,129 @@
 from __future__ import annotations
 
 import json
+import mmap
 import os
-from typing import Dict, List
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from io_utils import scan_markdown
+
+try:  # optional: C-speed JSON encoding/decoding of the index
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib json module
+    orjson = None
 
 
 DEFAULT_RUNBOOK_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "runbooks")
 DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "vector_db", "index.json")
 
+INGEST_WORKERS = 16
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+_TOKEN_BYTES_RE = re.compile(rb"[A-Za-z0-9_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens, dropping very short ones.
+
+    Tokens are interned: they end up as posting keys and are looked up again
+    for every query, so equal terms share one string object.
+    """
+    return [sys.intern(t) for t in _TOKEN_RE.findall(text.lower()) if len(t) >= 3]
+
+
+def count_file_terms(path: str) -> Counter:
+    """Term frequencies of a file, tokenized straight from an mmap of its bytes.
+
+    Matches `tokenize` on the decoded text: only ASCII word characters form
+    tokens, so the UTF-8 bytes never need to be decoded into one big string.
+    """
+    tf: Counter = Counter()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return tf
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for m in _TOKEN_BYTES_RE.finditer(mm):
+                if m.end() - m.start() >= 3:
+                    tf[sys.intern(m.group().lower().decode("ascii"))] += 1
+    return tf
+
+
+def build_index(texts: Dict[str, str]) -> Dict[str, Any]:
+    """Build an inverted index over runbook texts keyed by path.
+
+    `postings` maps each term to `[doc_id, term_frequency]` pairs and `docs`
+    holds per-document stats (path, token count, mtime), which is everything
+    BM25 needs without touching the runbook text at query time.
+    """
+    return _build_postings({path: Counter(tokenize(text)) for path, text in texts.items()})
+
+
+def _build_postings(term_counts: Dict[str, Counter]) -> Dict[str, Any]:
+    postings: Dict[str, List[List[Any]]] = {}
+    docs: Dict[str, Dict[str, Any]] = {}
+    for path, tf in term_counts.items():
+        doc_id = os.path.basename(path)
+        for term, count in tf.items():
+            postings.setdefault(term, []).append([doc_id, count])
+        docs[doc_id] = {
+            "path": path,
+            "len": sum(tf.values()),
+            "mtime_ns": os.stat(path).st_mtime_ns,
+        }
+
+    total_len = sum(d["len"] for d in docs.values())
+    return {
+        "postings": postings,
+        "docs": docs,
+        "avgdl": (total_len / len(docs)) if docs else 0.0,
+    }
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    # Compact output: the index is read by code, not people.
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(data))
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def load_index(index_path: str = DEFAULT_INDEX_PATH) -> Dict[str, Any]:
+    """Load an index written by `ingest_runbooks`."""
+    with open(index_path, "rb") as f:
+        raw = f.read()
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
 
 def ingest_runbooks(runbook_dir: str = DEFAULT_RUNBOOK_DIR, index_path: str = DEFAULT_INDEX_PATH) -> Dict[str, int]:
     """Lightweight ingestion: builds a simple JSON index of markdown runbooks.
 
-    This keeps the repo runnable without requiring a vector database. If you later
+    The index lists the runbook files and stores an inverted index (see
+    `build_index`) that `RunbookAgent` uses for BM25 retrieval. Runbook text is
+    not copied into it; files are tokenized from an mmap. If you later
     want embeddings + similarity search, this function is the natural extension
     point.
     """
     if not os.path.isdir(runbook_dir):
         return {"runbooks_indexed": 0}
 
-    runbooks: List[Dict[str, str]] = []
-    for name in sorted(os.listdir(runbook_dir)):
-        if not name.lower().endswith(".md"):
-            continue
-        path = os.path.join(runbook_dir, name)
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                content = f.read()
-        except UnicodeDecodeError:
-            with open(path, "r", encoding="utf-8", errors="replace") as f:
-                content = f.read()
-        runbooks.append({"filename": name, "path": path, "content": content})
+    entries = scan_markdown(runbook_dir)
+    paths = [e.path for e in entries]
+    runbooks = [{"filename": e.name, "path": e.path} for e in entries]
+
+    # Files are read and tokenized concurrently; map() keeps the sorted order,
+    # so the index itself is still built deterministically in this thread.
+    with ThreadPoolExecutor(max_workers=INGEST_WORKERS) as executor:
+        term_counts = dict(zip(paths, executor.map(count_file_terms, paths)))
+
+    index = _build_postings(term_counts)
 
     os.makedirs(os.path.dirname(index_path), exist_ok=True)
-    with open(index_path, "w", encoding="utf-8") as f:
-        json.dump({"runbooks": runbooks}, f, indent=2)
+    _write_json(index_path, {"runbooks": runbooks, **index})
 
     return {"runbooks_indexed": len(runbooks)}
-
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import List
+
+_UTF8_BOM = b"\xef\xbb\xbf"
+
+
+def scan_markdown(directory: str, follow_symlinks: bool = True) -> List[os.DirEntry]:
+    """Markdown files directly inside `directory`, sorted by name.
+
+    DirEntry objects carry the path and cache their stat result, so callers
+    need no extra joins or stat calls. With `follow_symlinks=False`, symlinks
+    to files are skipped.
+    """
+    with os.scandir(directory) as it:
+        return sorted(
+            (e for e in it if e.is_file(follow_symlinks=follow_symlinks) and e.name.lower().endswith(".md")),
+            key=lambda e: e.name,
+        )
+
+
+def read_text(path: str) -> str:
+    """Read a text file with one read and one decode.
+
+    Runbooks are almost always UTF-8 (a leading BOM is dropped); anything that
+    is not valid UTF-8 is decoded as Windows-1252.
+    """
+    return decode_text(Path(path).read_bytes())
+
+
+def decode_text(raw: bytes) -> str:
+    """Decode runbook bytes the way `read_text` does."""
+    if raw.startswith(_UTF8_BOM):
+        raw = raw[len(_UTF8_BOM) :]
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("cp1252", errors="replace")
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import gc
+import hashlib
+import mimetypes
+import mmap
+import os
+import threading
+import time
+import zipfile
+from typing import Any, Callable, Dict, List
+from xml.etree import ElementTree
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import streamlit as st
+
+from io_utils import decode_text
+
+
+DEFAULT_UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads")
+UPLOAD_CHUNK_SIZE = 1 << 20
+# PDFs above this size are extracted page by page to a text file on disk.
+LARGE_PDF_BYTES = 50 * 1024 * 1024
+# XML namespace of the WordprocessingML elements in a .docx.
+_WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# Metadata of uploaded documents (no content) is kept in one Parquet file;
+# each row belongs to the browser session that uploaded the document.
+INDEX_FILENAME = "index.parquet"
+INDEX_SCHEMA = pa.schema(
+    [
+        ("session", pa.string()),
+        ("name", pa.string()),
+        ("path", pa.string()),
+        ("size", pa.int64()),
+        ("sha256", pa.string()),
+        ("mtime", pa.float64()),
+    ]
+)
+_INDEX_LOCK = threading.Lock()
+# Uploads older than this are deleted the next time the index is rewritten.
+UPLOAD_TTL_SECONDS = 24 * 60 * 60
+
+
+@st.cache_resource(show_spinner=False)
+def get_upload_dir(upload_dir: str = DEFAULT_UPLOAD_DIR) -> str:
+    """Create the uploads directory once per process and return its path."""
+    os.makedirs(upload_dir, exist_ok=True)
+    return upload_dir
+
+
+def session_upload_dir(upload_dir: str, session_id: str) -> str:
+    """Directory holding the files uploaded by one browser session."""
+    return os.path.join(upload_dir, session_id)
+
+
+def file_hash(uploaded_file: Any) -> str:
+    # getbuffer() is a zero-copy view over the upload, unlike getvalue().
+    return hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+
+
+def persist_upload(file_bytes_hash: str, name: str, upload_dir: str, uploaded_file: Any) -> Dict[str, Any]:
+    """Stream an uploaded file to disk and return its metadata.
+
+    The file is written to a temporary name first and then moved into place,
+    so a crash never leaves a partially written upload behind.
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    file_path = os.path.join(upload_dir, f"{file_bytes_hash}_{name}")
+    tmp_path = f"{file_path}.tmp"
+    size = 0
+    uploaded_file.seek(0)
+    with open(tmp_path, "wb") as f:
+        for chunk in iter(lambda: uploaded_file.read(UPLOAD_CHUNK_SIZE), b""):
+            f.write(chunk)
+            size += len(chunk)
+    os.replace(tmp_path, file_path)
+    return {"name": name, "path": file_path, "size": size, "sha256": file_bytes_hash}
+
+
+def _index_path(upload_dir: str) -> str:
+    return os.path.join(upload_dir, INDEX_FILENAME)
+
+
+def _load_index_table(upload_dir: str) -> pa.Table:
+    index_path = _index_path(upload_dir)
+    if not os.path.exists(index_path):
+        return INDEX_SCHEMA.empty_table()
+    return pq.read_table(index_path, schema=INDEX_SCHEMA)
+
+
+def _prune_index_table(table: pa.Table) -> pa.Table:
+    """Drop rows whose file is gone, deleting uploads older than UPLOAD_TTL_SECONDS.
+
+    Sessions never say goodbye, so this is what keeps the index (and the
+    uploads dir) from growing with every session the server has seen.
+    """
+    cutoff = time.time() - UPLOAD_TTL_SECONDS
+    keep = []
+    for row in table.select(["path", "mtime"]).to_pylist():
+        if row["mtime"] < cutoff:
+            delete_upload(row["path"])
+            try:
+                # Drop the session's directory once its last upload is gone.
+                os.rmdir(os.path.dirname(row["path"]))
+            except OSError:
+                pass
+            keep.append(False)
+        else:
+            keep.append(os.path.exists(row["path"]))
+    return table.filter(pa.array(keep, type=pa.bool_()))
+
+
+def _write_index_table(upload_dir: str, table: pa.Table) -> None:
+    # Write next to the index and swap it in, so readers never see a partial file.
+    index_path = _index_path(upload_dir)
+    tmp_path = f"{index_path}.tmp"
+    pq.write_table(_prune_index_table(table), tmp_path)
+    os.replace(tmp_path, index_path)
+
+
+def add_to_index(upload_dir: str, session_id: str, doc_info: Dict[str, Any]) -> None:
+    """Append a session's uploaded document to the uploads index."""
+    row = {**doc_info, "session": session_id, "mtime": os.path.getmtime(doc_info["path"])}
+    with _INDEX_LOCK:
+        table = pa.concat_tables(
+            [_load_index_table(upload_dir), pa.Table.from_pylist([row], schema=INDEX_SCHEMA)]
+        )
+        _write_index_table(upload_dir, table)
+
+
+def remove_from_index(upload_dir: str, session_id: str, sha256: str) -> None:
+    """Drop one of a session's documents from the uploads index."""
+    with _INDEX_LOCK:
+        table = _load_index_table(upload_dir)
+        match = pc.and_(pc.equal(table["session"], session_id), pc.equal(table["sha256"], sha256))
+        _write_index_table(upload_dir, table.filter(pc.invert(match)))
+
+
+def clear_session_index(upload_dir: str, session_id: str) -> None:
+    """Drop all of a session's documents from the uploads index."""
+    with _INDEX_LOCK:
+        table = _load_index_table(upload_dir)
+        _write_index_table(upload_dir, table.filter(pc.not_equal(table["session"], session_id)))
+
+
+# Every index write creates a new cache key, so only the latest reads are kept.
+@st.cache_data(show_spinner=False, max_entries=64)
+def _read_index(index_path: str, session_id: str, mtime_ns: int, size: int) -> List[Dict[str, Any]]:
+    table = pq.read_table(index_path, columns=INDEX_SCHEMA.names)
+    return table.filter(pc.equal(table["session"], session_id)).to_pylist()
+
+
+def read_index(upload_dir: str, session_id: str) -> List[Dict[str, Any]]:
+    """Return the metadata rows of the documents a session has uploaded."""
+    index_path = _index_path(upload_dir)
+    try:
+        stat = os.stat(index_path)
+    except OSError:
+        return []
+    return _read_index(index_path, session_id, stat.st_mtime_ns, stat.st_size)
+
+
+def _pdf_text_path(path: str) -> str:
+    return f"{path}.txt"
+
+
+def delete_upload(path: str) -> None:
+    """Delete an uploaded file along with any text extracted from it."""
+    for file_path in (path, _pdf_text_path(path)):
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+
+
+@st.cache_data(show_spinner=False)
+def _extract_pdf_to_disk(path: str, mtime: float) -> str:
+    """Stream the text of a large PDF to `<path>.txt` and return that path."""
+    from pypdf import PdfReader
+
+    text_path = _pdf_text_path(path)
+    with open(path, "rb") as pdf_file:
+        pdf_reader = PdfReader(pdf_file)
+        with open(text_path, "w", encoding="utf-8") as out:
+            for text in (page.extract_text() or "" for page in pdf_reader.pages):
+                out.write(text)
+                out.write("\n")
+    del pdf_reader
+    gc.collect()
+    return text_path
+
+
+def _read_mapped(path: str) -> str:
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return ""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Same decoding as the runbooks (BOM stripped, cp1252 fallback).
+                return decode_text(mm[:])
+    except OSError:
+        return ""
+
+
+def _decode_text(path: str, mtime: float) -> str:
+    return _read_mapped(path)
+
+
+def _extract_pdf(path: str, mtime: float) -> str:
+    try:
+        from pypdf import PdfReader
+
+        pdf_reader = PdfReader(path)
+        return "\n".join(page.extract_text() or "" for page in pdf_reader.pages)
+    except Exception as e:
+        return f"Error reading PDF: {str(e)}"
+
+
+def _extract_docx(path: str, mtime: float) -> str:
+    # A .docx is a zip archive; paragraph text lives in word/document.xml.
+    try:
+        with zipfile.ZipFile(path) as archive:
+            root = ElementTree.fromstring(archive.read("word/document.xml"))
+    except (OSError, KeyError, zipfile.BadZipFile, ElementTree.ParseError):
+        return f"Unable to extract text from {os.path.basename(path)}"
+    paragraphs = (
+        "".join(node.text or "" for node in para.iter(f"{_WORD_NS}t"))
+        for para in root.iter(f"{_WORD_NS}p")
+    )
+    return "\n".join(paragraphs)
+
+
+def _decode_fallback(path: str, mtime: float) -> str:
+    mime, _ = mimetypes.guess_type(path)
+    if mime is None or mime.startswith("text/"):
+        return _read_mapped(path)
+    # Never decode binary formats (e.g. .doc) as UTF-8.
+    return f"Unable to extract text from {os.path.basename(path)}"
+
+
+HANDLERS: Dict[str, Callable[[str, float], str]] = {
+    ".txt": _decode_text,
+    ".md": _decode_text,
+    ".pdf": _extract_pdf,
+    ".docx": _extract_docx,
+}
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def extract_text(path: str, mtime: float) -> str:
+    """Return the text of an uploaded document, cached by path and mtime.
+
+    Only the most recently used documents are kept; older text is read from
+    disk again when it is needed.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    return HANDLERS.get(ext, _decode_fallback)(path, mtime)
+
+
+def load_doc_text(path: str) -> str:
+    """Lazily load the text of an uploaded document from disk."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return ""
+    if path.lower().endswith(".pdf") and stat.st_size > LARGE_PDF_BYTES:
+        # Only the path of the extracted text is cached, not the text itself.
+        try:
+            return _read_mapped(_extract_pdf_to_disk(path, stat.st_mtime))
+        except Exception as e:
+            return f"Error reading PDF: {str(e)}"
+    return extract_text(path, stat.st_mtime)